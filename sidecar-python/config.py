@@ -25,38 +25,64 @@ import os
 import logging
 from typing import Optional
 
+# Log level names accepted in LOG_LEVEL, built once at import
+_LOG_LEVELS = {
+    "DEBUG": logging.DEBUG,
+    "INFO": logging.INFO,
+    "WARNING": logging.WARNING,
+    "ERROR": logging.ERROR,
+    "CRITICAL": logging.CRITICAL,
+}
+
+# Settings that must be non-empty, mapped to the variable that supplies them
+_REQUIRED_SETTINGS = (
+    ("otel_endpoint", "OTEL_EXPORTER_OTLP_ENDPOINT"),
+    ("service_name", "OTEL_SERVICE_NAME"),
+    ("metrics_file_path", "METRICS_FILE_PATH"),
+)
+
 
 class Config:
     """Configuration for the OpenTelemetry metrics bridge."""
     
-    def __init__(self):
+    __slots__ = (
+        'otel_endpoint',
+        'service_name',
+        'metrics_file_path',
+        'collection_interval',
+        'log_level',
+    )
+    
+    def __init__(self) -> None:
         """Initialize configuration from environment variables."""
+        env = os.environ
+        
         # OpenTelemetry configuration
-        self.otel_endpoint = os.getenv(
+        self.otel_endpoint = env.get(
             "OTEL_EXPORTER_OTLP_ENDPOINT",
             "http://localhost:4317"
         )
-        self.service_name = os.getenv(
+        self.service_name = env.get(
             "OTEL_SERVICE_NAME",
             "ml-metrics-bridge"
         )
         
         # Metrics file configuration
-        self.metrics_file_path = os.getenv(
+        self.metrics_file_path = env.get(
             "METRICS_FILE_PATH",
             "/shared/metrics/current.json"
         )
         
         # Collection interval in seconds
         self.collection_interval = self._parse_int(
-            os.getenv("COLLECTION_INTERVAL", "10"),
+            env.get("COLLECTION_INTERVAL", "10"),
             default=10,
             min_value=1
         )
         
         # Logging configuration
         self.log_level = self._parse_log_level(
-            os.getenv("LOG_LEVEL", "INFO")
+            env.get("LOG_LEVEL", "INFO")
         )
         
         # Validate configuration
@@ -78,25 +104,13 @@ class Config:
     
     def _parse_log_level(self, level: str) -> int:
         """Parse log level string to logging constant."""
-        level_map = {
-            "DEBUG": logging.DEBUG,
-            "INFO": logging.INFO,
-            "WARNING": logging.WARNING,
-            "ERROR": logging.ERROR,
-            "CRITICAL": logging.CRITICAL,
-        }
-        return level_map.get(level.upper(), logging.INFO)
+        return _LOG_LEVELS.get(level.upper(), logging.INFO)
     
-    def _validate(self):
+    def _validate(self) -> None:
         """Validate configuration values."""
-        if not self.otel_endpoint:
-            raise ValueError("OTEL_EXPORTER_OTLP_ENDPOINT cannot be empty")
-        
-        if not self.service_name:
-            raise ValueError("OTEL_SERVICE_NAME cannot be empty")
-        
-        if not self.metrics_file_path:
-            raise ValueError("METRICS_FILE_PATH cannot be empty")
+        for attr, env_var in _REQUIRED_SETTINGS:
+            if not getattr(self, attr):
+                raise ValueError(f"{env_var} cannot be empty")
     
     def __str__(self) -> str:
         """String representation of configuration."""
@@ -107,4 +121,15 @@ class Config:
             f"metrics_file_path={self.metrics_file_path}, "
             f"collection_interval={self.collection_interval}s, "
             f"log_level={logging.getLevelName(self.log_level)})"
-        )
\ No newline at end of file
+        )
+
+
+_CONFIG_SINGLETON: Optional[Config] = None
+
+
+def get_config() -> Config:
+    """Return the process-wide configuration, loading it on first access."""
+    global _CONFIG_SINGLETON
+    if _CONFIG_SINGLETON is None:
+        _CONFIG_SINGLETON = Config()
+    return _CONFIG_SINGLETON
\ No newline at end of file
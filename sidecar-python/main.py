@@ -5,43 +5,126 @@ OpenTelemetry Metrics Bridge Sidecar
 This sidecar collects ML training metrics from a shared volume
 and exports them via OpenTelemetry Protocol (OTLP).
 """
-import json
+from __future__ import annotations
+
 import logging
+import os
 import signal
 import sys
 import time
+from functools import partial
 from pathlib import Path
-from typing import Dict, Any, Optional
+from types import FrameType
+from typing import Dict, Any, Iterator, Optional, Set, Tuple
 
+import orjson
 from opentelemetry import metrics
+from opentelemetry.metrics import CallbackOptions, Observation
 from opentelemetry.sdk.metrics import MeterProvider
 from opentelemetry.sdk.metrics.export import PeriodicExportingMetricReader
 from opentelemetry.exporter.otlp.proto.grpc.metric_exporter import OTLPMetricExporter
 from opentelemetry.sdk.resources import Resource
 
-from config import Config
+from config import Config, get_config
+
+try:
+    from watchfiles import Change, watch
+except ImportError:  # Fall back to polling without the native watcher
+    watch = None  # type: ignore[assignment]
+
+# Top-level sections of the metrics JSON document
+_JOB_METADATA = sys.intern('job_metadata')
+_TRAINING_METRICS = sys.intern('training_metrics')
+
+# Attribute keys attached to every observation, plus the fallback value
+_JOB_ID = sys.intern('job.id')
+_MODEL_NAME = sys.intern('model.name')
+_DATASET = sys.intern('dataset')
+_EPOCH = sys.intern('epoch')
+_BATCH = sys.intern('batch')
+_UNKNOWN = sys.intern('unknown')
+
+# Longest single sleep in the polling fallback, bounding shutdown latency
+_POLL_SLICE = 1.0
+
+
+class _StopFlag:
+    """Stop event for watchfiles that is set once the bridge stops running.
+    
+    Unlike threading.Event it takes no lock, so the signal handler can stop
+    the watch by clearing MetricsBridge.running without risking a deadlock.
+    """
+    
+    __slots__ = ('_bridge',)
+    
+    def __init__(self, bridge: MetricsBridge) -> None:
+        self._bridge = bridge
+    
+    def is_set(self) -> bool:
+        return not self._bridge.running
 
 
 class MetricsBridge:
     """Bridge between file-based metrics and OpenTelemetry."""
     
-    def __init__(self, config: Config):
+    __slots__ = (
+        'config',
+        'running',
+        '_metrics_path',
+        '_metrics_path_str',
+        '_metrics_parent',
+        '_metrics_name',
+        'logger',
+        'meter',
+        'training_loss',
+        'validation_loss',
+        'accuracy',
+        'learning_rate',
+        'gpu_utilization',
+        'batch_counter',
+        'epoch_counter',
+        'processing_time',
+        'samples_per_second',
+        '_debug_enabled',
+        '_snapshot',
+        '_last_stat',
+        '_cached_data',
+        '_read_buf',
+        '_watcher',
+        '_watch_confirmed',
+        '_next_poll',
+    )
+    
+    def __init__(self, config: Config) -> None:
         """Initialize the metrics bridge."""
         self.config = config
         self.running = True
+        
+        # Resolve the metrics file location once rather than on every read
+        self._metrics_path = Path(config.metrics_file_path)
+        self._metrics_path_str = str(self._metrics_path)
+        self._metrics_parent = self._metrics_path.parent
+        self._metrics_name = self._metrics_path.name
+        
         self.logger = logging.getLogger(__name__)
         
+        # Logging is configured before the bridge is built, so the level is fixed
+        self._debug_enabled = self.logger.isEnabledFor(logging.DEBUG)
+        
         # Initialize OpenTelemetry
         self._init_otel()
         
         # Create metric instruments
         self._create_instruments()
         
+        # Watch the metrics directory for updates
+        self._init_watcher()
+        
         # Register signal handlers for graceful shutdown
         signal.signal(signal.SIGTERM, self._signal_handler)
         signal.signal(signal.SIGINT, self._signal_handler)
     
-    def _init_otel(self):
+    def _init_otel(self) -> None:
         """Initialize OpenTelemetry SDK with OTLP exporter."""
         self.logger.info(f"Initializing OpenTelemetry with endpoint: {self.config.otel_endpoint}")
         
@@ -57,10 +140,11 @@ class MetricsBridge:
             insecure=True  # Using insecure for internal cluster communication
         )
         
-        # Create metric reader with periodic export
+        # Create metric reader exporting once per collection interval, so each
+        # export carries a fresh snapshot rather than repeating the last one
         reader = PeriodicExportingMetricReader(
             exporter=exporter,
-            export_interval_millis=5000  # Export every 5 seconds
+            export_interval_millis=self.config.collection_interval * 1000
         )
         
         # Create and set meter provider
@@ -78,7 +162,7 @@ class MetricsBridge:
         
         self.logger.info("OpenTelemetry initialized successfully")
     
-    def _create_instruments(self):
+    def _create_instruments(self) -> None:
         """Create metric instruments for ML training metrics."""
         self.logger.info("Creating metric instruments")
         
@@ -86,44 +170,44 @@ class MetricsBridge:
         self.training_loss = self.meter.create_observable_gauge(
             name="ml.training.loss",
             description="Training loss value",
-            callbacks=[self._get_training_loss]
+            callbacks=[partial(self._observe, 'training_loss')]
         )
         
         self.validation_loss = self.meter.create_observable_gauge(
             name="ml.validation.loss",
             description="Validation loss value",
-            callbacks=[self._get_validation_loss]
+            callbacks=[partial(self._observe, 'validation_loss')]
         )
         
         self.accuracy = self.meter.create_observable_gauge(
             name="ml.training.accuracy",
             description="Model accuracy",
-            callbacks=[self._get_accuracy]
+            callbacks=[partial(self._observe, 'accuracy')]
         )
         
         self.learning_rate = self.meter.create_observable_gauge(
             name="ml.training.learning_rate",
             description="Current learning rate",
-            callbacks=[self._get_learning_rate]
+            callbacks=[partial(self._observe, 'learning_rate')]
         )
         
         self.gpu_utilization = self.meter.create_observable_gauge(
             name="ml.training.gpu_utilization",
             description="GPU utilization percentage",
-            callbacks=[self._get_gpu_utilization]
+            callbacks=[partial(self._observe, 'gpu_utilization')]
         )
         
         # Counters for cumulative values
         self.batch_counter = self.meter.create_observable_counter(
             name="ml.training.batch_number",
             description="Current batch number",
-            callbacks=[self._get_batch_number]
+            callbacks=[partial(self._observe, 'batch_number')]
         )
         
         self.epoch_counter = self.meter.create_observable_counter(
             name="ml.training.epoch",
             description="Current epoch number",
-            callbacks=[self._get_epoch]
+            callbacks=[partial(self._observe, 'epoch')]
         )
         
         # Histograms for distributions
@@ -139,169 +223,224 @@ class MetricsBridge:
             unit="samples/s"
         )
         
-        # Store current metrics for observable callbacks
-        self.current_metrics: Optional[Dict[str, Any]] = None
+        # (training_metrics, attributes) shared by all observable callbacks,
+        # swapped as one tuple so callbacks never see a mismatched pair.
+        # The attributes dict is handed to every Observation as-is and never
+        # mutated after publication; the SDK copies plain dicts on its fast path.
+        self._snapshot: Tuple[Dict[str, Any], Dict[str, Any]] = ({}, {})
+        
+        # (mtime_ns, size) of the last parsed file, used to skip re-parsing
+        self._last_stat: Optional[Tuple[int, int]] = None
+        self._cached_data: Optional[Dict[str, Any]] = None
+        
+        # Reusable buffer for reading the metrics file without per-read allocations
+        self._read_buf = bytearray(65536)
         
         self.logger.info("Metric instruments created successfully")
     
-    def _signal_handler(self, signum, frame):
+    def _init_watcher(self) -> None:
+        """Set up a native watch on the metrics file's parent directory."""
+        self._watcher: Optional[Iterator[Set[Tuple[Change, str]]]] = None
+        self._watch_confirmed = False
+        
+        # Polling deadline, re-anchored when run() starts
+        self._next_poll = 0.0
+        
+        if watch is None:
+            self.logger.info("watchfiles not available, falling back to polling")
+            return
+        
+        # Rapid successive writes are coalesced by the debounce window; the
+        # stop flag ends the watch as soon as a shutdown is requested. The
+        # watch only starts on the first next(), so an empty change set is
+        # yielded every interval as a heartbeat to catch writes made before
+        # then; the stat cache keeps those re-checks cheap.
+        self._watcher = watch(
+            self._metrics_parent,
+            watch_filter=self._is_metrics_update,
+            debounce=200,
+            stop_event=_StopFlag(self),
+            rust_timeout=self.config.collection_interval * 1000,
+            yield_on_timeout=True,
+            recursive=False,
+        )
+    
+    def _is_metrics_update(self, change: Change, path: str) -> bool:
+        """Filter watch events down to writes of the metrics file."""
+        return change != Change.deleted and os.path.basename(path) == self._metrics_name
+    
+    def _wait_for_update(self) -> bool:
+        """Block until the metrics file changes or the collection interval elapses.
+        
+        Returns True if the metrics file should be re-read.
+        """
+        if self._watcher is not None:
+            try:
+                # Yields filtered change sets (empty on heartbeat timeouts) and
+                # is exhausted once the bridge stops running
+                changes = next(self._watcher, None)
+                if changes is None:
+                    return False
+                
+                # The watch only exists once the first next() has succeeded
+                if not self._watch_confirmed:
+                    self._watch_confirmed = True
+                    self.logger.info(f"Watching {self._metrics_parent} for metrics file updates")
+                return True
+            except Exception as e:
+                # Covers OSError for a missing directory as well as watchfiles'
+                # RuntimeError-based errors from the underlying watcher
+                self.logger.warning(f"Failed to watch {self._metrics_parent}, falling back to polling: {e}")
+                self._watcher = None
+                self._next_poll = time.monotonic()
+        
+        # Sleep until the next deadline so per-iteration work doesn't add drift
+        self._next_poll += self.config.collection_interval
+        sleep_for = self._next_poll - time.monotonic()
+        if sleep_for > 0:
+            # Sleep in short slices so a shutdown request is noticed promptly
+            while self.running and sleep_for > 0:
+                time.sleep(min(sleep_for, _POLL_SLICE))
+                sleep_for = self._next_poll - time.monotonic()
+        else:
+            self.logger.warning(f"Collection overran interval by {-sleep_for:.3f}s")
+            self._next_poll = time.monotonic()
+        return True
+    
+    def _signal_handler(self, signum: int, frame: Optional[FrameType]) -> None:
         """Handle shutdown signals gracefully."""
         self.logger.info(f"Received signal {signum}, initiating graceful shutdown")
         self.running = False
     
     def _read_metrics_file(self) -> Optional[Dict[str, Any]]:
         """Read and parse metrics from JSON file."""
-        metrics_path = Path(self.config.metrics_file_path)
-        
         try:
-            if not metrics_path.exists():
-                self.logger.debug(f"Metrics file does not exist yet: {metrics_path}")
-                return None
-            
-            with open(metrics_path, 'r') as f:
-                data = json.load(f)
+            st = os.stat(self._metrics_path_str)
             
-            # Validate structure
-            if 'job_metadata' not in data or 'training_metrics' not in data:
-                self.logger.warning("Invalid metrics file structure")
-                return None
+            # Skip re-parsing when the file has not changed since the last read
+            key = (st.st_mtime_ns, st.st_size)
+            if key == self._last_stat:
+                return self._cached_data
             
-            return data
+            size = self._read_into_buffer(self._metrics_path_str)
+            with memoryview(self._read_buf) as view:
+                data = orjson.loads(view[:size])
         
-        except json.JSONDecodeError as e:
-            self.logger.error(f"Failed to parse metrics JSON: {e}")
+        except FileNotFoundError:
+            if self._debug_enabled:
+                self.logger.debug("Metrics file does not exist yet: %s", self._metrics_path_str)
             return None
         
-        except IOError as e:
-            self.logger.error(f"Failed to read metrics file: {e}")
+        except (OSError, orjson.JSONDecodeError) as e:
+            self.logger.error(f"Failed to read/parse metrics file: {e}")
             return None
         
-        except Exception as e:
-            self.logger.error(f"Unexpected error reading metrics: {e}")
+        # Validate structure
+        if (not isinstance(data, dict)
+                or _JOB_METADATA not in data or _TRAINING_METRICS not in data):
+            self.logger.warning("Invalid metrics file structure")
             return None
+        
+        self._last_stat = key
+        self._cached_data = data
+        return data
+    
+    def _read_into_buffer(self, path: str) -> int:
+        """Read a whole file into the reusable read buffer, returning its size."""
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            size = 0
+            while True:
+                if size == len(self._read_buf):
+                    # File outgrew the buffer; double it and keep reading
+                    self._read_buf.extend(bytes(len(self._read_buf)))
+                with memoryview(self._read_buf) as view:
+                    n = os.readv(fd, [view[size:]])
+                if n == 0:
+                    return size
+                size += n
+        finally:
+            os.close(fd)
     
     def _get_attributes(self, metrics_data: Dict[str, Any]) -> Dict[str, Any]:
         """Extract attributes from metrics data."""
-        metadata = metrics_data.get('job_metadata', {})
-        training = metrics_data.get('training_metrics', {})
+        metadata_get = metrics_data.get(_JOB_METADATA, {}).get
+        training_get = metrics_data.get(_TRAINING_METRICS, {}).get
         
         return {
-            'job.id': metadata.get('job_id', 'unknown'),
-            'model.name': metadata.get('model_name', 'unknown'),
-            'dataset': metadata.get('dataset', 'unknown'),
-            'epoch': training.get('epoch', 0),
-            'batch': training.get('batch_number', 0),
+            _JOB_ID: metadata_get('job_id', _UNKNOWN),
+            _MODEL_NAME: metadata_get('model_name', _UNKNOWN),
+            _DATASET: metadata_get('dataset', _UNKNOWN),
+            _EPOCH: training_get('epoch', 0),
+            _BATCH: training_get('batch_number', 0),
         }
     
-    # Observable callbacks for gauges and counters
-    def _get_training_loss(self, options):
-        """Callback for training loss gauge."""
-        if self.current_metrics:
-            training = self.current_metrics.get('training_metrics', {})
-            loss = training.get('training_loss')
-            if loss is not None:
-                attrs = self._get_attributes(self.current_metrics)
-                yield metrics.Observation(loss, attrs)
-    
-    def _get_validation_loss(self, options):
-        """Callback for validation loss gauge."""
-        if self.current_metrics:
-            training = self.current_metrics.get('training_metrics', {})
-            loss = training.get('validation_loss')
-            if loss is not None:
-                attrs = self._get_attributes(self.current_metrics)
-                yield metrics.Observation(loss, attrs)
-    
-    def _get_accuracy(self, options):
-        """Callback for accuracy gauge."""
-        if self.current_metrics:
-            training = self.current_metrics.get('training_metrics', {})
-            acc = training.get('accuracy')
-            if acc is not None:
-                attrs = self._get_attributes(self.current_metrics)
-                yield metrics.Observation(acc, attrs)
-    
-    def _get_learning_rate(self, options):
-        """Callback for learning rate gauge."""
-        if self.current_metrics:
-            training = self.current_metrics.get('training_metrics', {})
-            lr = training.get('learning_rate')
-            if lr is not None:
-                attrs = self._get_attributes(self.current_metrics)
-                yield metrics.Observation(lr, attrs)
-    
-    def _get_gpu_utilization(self, options):
-        """Callback for GPU utilization gauge."""
-        if self.current_metrics:
-            training = self.current_metrics.get('training_metrics', {})
-            gpu = training.get('gpu_utilization')
-            if gpu is not None:
-                attrs = self._get_attributes(self.current_metrics)
-                yield metrics.Observation(gpu, attrs)
-    
-    def _get_batch_number(self, options):
-        """Callback for batch counter."""
-        if self.current_metrics:
-            training = self.current_metrics.get('training_metrics', {})
-            batch = training.get('batch_number')
-            if batch is not None:
-                attrs = self._get_attributes(self.current_metrics)
-                yield metrics.Observation(batch, attrs)
+    def _observe(self, field: str, options: CallbackOptions) -> Tuple[Observation, ...]:
+        """Observable callback returning one training_metrics field, if present."""
+        training, attrs = self._snapshot
+        value = training.get(field)
+        return (Observation(value, attrs),) if value is not None else ()
     
-    def _get_epoch(self, options):
-        """Callback for epoch counter."""
-        if self.current_metrics:
-            training = self.current_metrics.get('training_metrics', {})
-            epoch = training.get('epoch')
-            if epoch is not None:
-                attrs = self._get_attributes(self.current_metrics)
-                yield metrics.Observation(epoch, attrs)
-    
-    def _process_metrics(self, metrics_data: Dict[str, Any]):
-        """Process metrics and record histogram values."""
-        training = metrics_data.get('training_metrics', {})
-        attrs = self._get_attributes(metrics_data)
+    def _process_metrics(self) -> None:
+        """Record histogram values from the current metrics snapshot."""
+        training, attrs = self._snapshot
+        training_get = training.get
+        processing_time = training_get('processing_time_ms')
+        samples_per_sec = training_get('samples_per_second')
         
-        # Record histogram values (these use direct recording, not callbacks)
-        processing_time = training.get('processing_time_ms')
+        # Record histogram values (these use direct recording, not callbacks).
+        # Zero is a valid reading, so compare against None rather than truthiness.
         if processing_time is not None:
             self.processing_time.record(processing_time, attrs)
         
-        samples_per_sec = training.get('samples_per_second')
         if samples_per_sec is not None:
             self.samples_per_second.record(samples_per_sec, attrs)
     
-    def run(self):
+    def run(self) -> None:
         """Main collection loop."""
         self.logger.info(f"Starting metrics collection loop (interval: {self.config.collection_interval}s)")
         self.logger.info(f"Monitoring file: {self.config.metrics_file_path}")
         
+        update_pending = True
+        published: Optional[Dict[str, Any]] = None
+        self._next_poll = time.monotonic()
         while self.running:
-            try:
-                # Read metrics from file
-                metrics_data = self._read_metrics_file()
-                
-                if metrics_data:
-                    # Store current metrics for observable callbacks
-                    self.current_metrics = metrics_data
+            if update_pending:
+                try:
+                    # Read metrics from file
+                    metrics_data = self._read_metrics_file()
                     
-                    # Process histogram metrics
-                    self._process_metrics(metrics_data)
+                    if metrics_data is not None and metrics_data is published:
+                        # Stat cache hit (heartbeat or poll): nothing new to publish
+                        # or record, the callbacks keep exporting the current snapshot
+                        pass
+                    elif metrics_data:
+                        # Publish the snapshot read by the observable callbacks
+                        published = metrics_data
+                        self._snapshot = (
+                            metrics_data.get(_TRAINING_METRICS, {}),
+                            self._get_attributes(metrics_data)
+                        )
+                        
+                        # Process histogram metrics
+                        self._process_metrics()
+                        
+                        if self._debug_enabled:
+                            training = self._snapshot[0]
+                            self.logger.debug("Processed metrics: epoch=%s, batch=%s",
+                                              training.get('epoch'), training.get('batch_number'))
+                    elif self._debug_enabled:
+                        self.logger.debug("No valid metrics data available")
                     
-                    self.logger.debug(f"Processed metrics: epoch={metrics_data.get('training_metrics', {}).get('epoch')}, "
-                                     f"batch={metrics_data.get('training_metrics', {}).get('batch_number')}")
-                else:
-                    self.logger.debug("No valid metrics data available")
-                
-            except Exception as e:
-                self.logger.error(f"Error in collection loop: {e}", exc_info=True)
+                except Exception as e:
+                    self.logger.error(f"Error in collection loop: {e}", exc_info=True)
             
-            # Sleep for collection interval
-            time.sleep(self.config.collection_interval)
+            # Wait for the next file update (or deadline when polling)
+            update_pending = self._wait_for_update()
         
         self.logger.info("Collection loop stopped")
     
-    def shutdown(self):
+    def shutdown(self) -> None:
         """Shutdown the metrics bridge gracefully."""
         self.logger.info("Shutting down metrics bridge")
         self.running = False
@@ -316,10 +455,10 @@ class MetricsBridge:
             self.logger.error(f"Error during shutdown: {e}")
 
 
-def main():
+def main() -> None:
     """Main entry point."""
     # Load configuration
-    config = Config()
+    config = get_config()
     
     # Configure logging
     logging.basicConfig(
@@ -0,0 +1,31 @@
+"""
+Optional ahead-of-time compilation of the sidecar with mypyc.
+
+The sidecar runs from plain source by default. Setting SIDECAR_MYPYC=1
+compiles main.py and config.py into C extensions that are imported in
+place of the .py files:
+
+    pip install mypy setuptools
+    SIDECAR_MYPYC=1 python setup.py build_ext --inplace
+    python -c "import main; main.main()"
+
+Running "python main.py" always executes the source file, so the compiled
+build must be started through an import as shown above.
+"""
+
+import os
+
+from setuptools import setup
+
+ext_modules = []
+if os.getenv("SIDECAR_MYPYC") == "1":
+    from mypyc.build import mypycify
+
+    ext_modules = mypycify(["main.py", "config.py"])
+
+setup(
+    name="ml-metrics-bridge",
+    version="1.0.0",
+    py_modules=["main", "config"],
+    ext_modules=ext_modules,
+)